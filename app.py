@@ -1,24 +1,29 @@
 # app.py
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import logging
 from werkzeug.utils import secure_filename
 import tempfile
 import traceback
+import orjson
 
-from extract import extract_text_from_pdf_fileobj, extract_text_from_txt_fileobj
-from summarize import generate_summary
+from extract import extract_text_from_pdf_path, extract_text_from_txt_fileobj
+from summarize import generate_summary, summarize_many, preload_summarizer, summary_config_key
 from highlight import top_k_sentences
+from cache import hash_stream, summary_cache
+from jobs import BatchJobQueue, JobQueueFull
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
+app.json.sort_keys = False
 
 # Configuration
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024 
 ALLOWED_EXTENSIONS = {'pdf', 'txt'}
 SUPPORTED_LENGTHS = ['short', 'medium', 'long']
+PDF_SPOOL_CHUNK_SIZE = 4 * 1024 * 1024
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +32,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Load the model once at import so `gunicorn --preload` shares it with every
+# worker thread instead of paying the load on the first request. Skipped when
+# re-imported as __mp_main__ by the PDF extraction process pool.
+if os.environ.get('PRELOAD_MODEL', '1') == '1' and __name__ != '__mp_main__':
+    preload_summarizer()
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
@@ -41,6 +52,62 @@ def get_length_params(length):
     }
     return length_configs.get(length, length_configs['medium'])
 
+def summary_response(response_data, status=200):
+    """Serialize a summary response with orjson, dropping the excerpt unless ?include_excerpt=1"""
+    if request.args.get('include_excerpt') != '1':
+        response_data = {key: value for key, value in response_data.items() if key != 'original_excerpt'}
+    return Response(orjson.dumps(response_data), status=status, mimetype='application/json')
+
+def build_response(text, summary, length, file_name, text_key=None):
+    """Add highlights to a summary and assemble the response body"""
+    highlights = []
+    try:
+        logger.info("Generating highlights...")
+        highlights = top_k_sentences(text, summary, k=5, text_key=text_key)
+        logger.info(f"Generated {len(highlights)} highlights")
+    except Exception as e:
+        logger.warning(f"Highlight generation failed, continuing without highlights: {str(e)}")
+        highlights = []
+    
+    return {
+        "summary": summary,
+        "highlights": highlights,
+        "original_excerpt": text[:2000], 
+        "metadata": {
+            "original_length": len(text),
+            "summary_length": len(summary),
+            "highlight_count": len(highlights),
+            "file_name": file_name,
+            "summary_type": length
+        }
+    }
+
+def run_summary_jobs(jobs):
+    """Summarize queued jobs, batching model calls across jobs with the same options"""
+    groups = {}
+    for n, job in enumerate(jobs):
+        groups.setdefault((job['length'], job['fast']), []).append(n)
+    
+    results = [None] * len(jobs)
+    for (length, fast), members in groups.items():
+        length_params = get_length_params(length)
+        summaries = summarize_many(
+            [jobs[n]['text'] for n in members],
+            max_chunk_chars=1200,
+            summary_max_length=length_params['max_len'],
+            summary_min_length=length_params['min_len'],
+            fast=fast
+        )
+        for n, summary in zip(members, summaries):
+            job = jobs[n]
+            results[n] = build_response(job['text'], summary, length, job['file_name'], job['digest'])
+            summary_cache.set(job['cache_key'], results[n])
+    return results
+
+# Background queue for ?async=1 requests. Point SUMMARIZER_DEVICE at a GPU and
+# run a single worker process so concurrent jobs share batched generate calls.
+summary_jobs = BatchJobQueue(run_summary_jobs)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -61,6 +128,7 @@ def supported_formats():
 @app.route('/api/summarize', methods=['POST'])
 def summarize_document():
     """Main endpoint for document summarization"""
+    pdf_path = None
     try:
         # Check if file part exists
         if 'file' not in request.files:
@@ -87,32 +155,76 @@ def summarize_document():
             length = 'medium'
         
         length_params = get_length_params(length)
+        fast = request.args.get('fast') == '1'
+        run_async = request.args.get('async') == '1'
         logger.info(f"Processing {file.filename} with {length} summary length")
         
-        # Extract text based on file type
         filename = file.filename.lower()
+        
+        if filename.endswith('.pdf'):
+            # Spool the PDF to a named file once, hashing it on the way, so the
+            # extractors can open it by path instead of copying the bytes again
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+                pdf_path = tmp.name
+                digest = hash_stream(file.stream, copy_to=tmp, block_size=PDF_SPOOL_CHUNK_SIZE)
+        else:
+            # Hashing and TXT extraction already read the stream in 1 MiB blocks
+            digest = hash_stream(file.stream)
+        
+        # Identical uploads with the same options reuse the earlier response.
+        # The file type is part of the key because the same bytes extract
+        # differently as PDF and TXT; the model settings are part of it because
+        # Redis may be shared with differently configured deployments.
+        file_type = filename.rsplit('.', 1)[1]
+        cache_key = f"{digest}:{file_type}:{length}:{summary_config_key(fast)}"
+        cached = summary_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Returning cached summary")
+            metadata = dict(cached["metadata"], file_name=secure_filename(file.filename))
+            return summary_response(dict(cached, metadata=metadata))
+        
+        # Extract text based on file type
         text = ""
         
         try:
-            if filename.endswith('.pdf'):
+            if pdf_path:
                 logger.info("Extracting text from PDF")
-                text = extract_text_from_pdf_fileobj(file)
+                text = extract_text_from_pdf_path(pdf_path)
             elif filename.endswith('.txt'):
                 logger.info("Extracting text from TXT")
-                # Reset file pointer for text extraction
-                file.seek(0)
-                text = extract_text_from_txt_fileobj(file)
+                text = extract_text_from_txt_fileobj(file.stream)
         except Exception as e:
             logger.error(f"Text extraction failed: {str(e)}")
             return jsonify({"error": f"Failed to extract text from file: {str(e)}"}), 400
         
-        # Validate extracted text
-        if not text or text.strip() == "":
+        # Validate extracted text (isspace() scans in place; strip() would copy it all)
+        if not text or text.isspace():
             logger.warning("No text content extracted from file")
             return jsonify({"error": "No readable text content found in the document"}), 400
         
         logger.info(f"Extracted {len(text)} characters from document")
         
+        # Hand off to the background queue; the client polls for the result
+        if run_async:
+            try:
+                job_id = summary_jobs.submit({
+                    "text": text,
+                    "length": length,
+                    "fast": fast,
+                    "file_name": secure_filename(file.filename),
+                    "digest": digest,
+                    "cache_key": cache_key
+                })
+            except JobQueueFull:
+                logger.warning("Summary job queue is full")
+                return jsonify({"error": "Too many queued summaries. Please try again later."}), 503
+            logger.info(f"Queued summary job {job_id}")
+            return jsonify({
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/summarize/{job_id}"
+            }), 202
+        
         # Generate summary
         try:
             logger.info("Generating summary...")
@@ -120,39 +232,21 @@ def summarize_document():
                 text, 
                 max_chunk_chars=1200, 
                 summary_max_length=length_params['max_len'],
-                summary_min_length=length_params['min_len']
+                summary_min_length=length_params['min_len'],
+                fast=fast
             )
             logger.info("Summary generated successfully")
         except Exception as e:
             logger.error(f"Summary generation failed: {str(e)}")
             return jsonify({"error": "Failed to generate summary. Please try again."}), 500
         
-        # Generate highlights
-        highlights = []
-        try:
-            logger.info("Generating highlights...")
-            highlights = top_k_sentences(text, summary, k=5)
-            logger.info(f"Generated {len(highlights)} highlights")
-        except Exception as e:
-            logger.warning(f"Highlight generation failed, continuing without highlights: {str(e)}")
-            highlights = []
-        
-        # Prepare response
-        response_data = {
-            "summary": summary,
-            "highlights": highlights,
-            "original_excerpt": text[:2000], 
-            "metadata": {
-                "original_length": len(text),
-                "summary_length": len(summary),
-                "highlight_count": len(highlights),
-                "file_name": secure_filename(file.filename),
-                "summary_type": length
-            }
-        }
+        # Generate highlights and prepare response
+        response_data = build_response(text, summary, length, secure_filename(file.filename), digest)
+        
+        summary_cache.set(cache_key, response_data)
         
         logger.info("Request completed successfully")
-        return jsonify(response_data)
+        return summary_response(response_data)
         
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
@@ -160,6 +254,24 @@ def summarize_document():
         return jsonify({
             "error": "An unexpected error occurred. Please try again later."
         }), 500
+    finally:
+        if pdf_path:
+            os.unlink(pdf_path)
+
+@app.route('/api/summarize/<job_id>', methods=['GET'])
+def summarize_job_status(job_id):
+    """Return the result of a job queued with /api/summarize?async=1"""
+    job = summary_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    if job["status"] == "done":
+        return summary_response(job["result"])
+    
+    if job["status"] == "failed":
+        return jsonify({"error": "Failed to generate summary. Please try again."}), 500
+    
+    return jsonify({"job_id": job_id, "status": job["status"]}), 202
 
 @app.route('/api/batch_summarize', methods=['POST'])
 def batch_summarize_documents():
@@ -185,5 +297,7 @@ def internal_error(e):
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
+    # Development server only; the reloader would import the model twice.
+    # In production run: gunicorn -w 1 --threads 8 --preload app:app
     logger.info("Starting Document Summarization API...")
-    app.run(host='0.0.0.0', port=int(os.environ.get("PORT", 5000)))
+    app.run(host='0.0.0.0', port=int(os.environ.get("PORT", 5000)), use_reloader=False)
@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = int(os.environ.get("SUMMARY_CACHE_TTL", 86400))
+LOCAL_CACHE_SIZE = int(os.environ.get("SUMMARY_CACHE_SIZE", 256))
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def _new_hasher():
+    """
+    xxh3 is several times faster than SHA-256; the algorithm name is part of
+    the digest so keys from both never collide in a shared Redis
+    """
+    if xxhash is not None:
+        return "xxh3", xxhash.xxh3_64()
+    return "sha256", hashlib.sha256()
+
+def hash_text(text):
+    """
+    Return a content digest for a str, encoding it in blocks so the whole
+    text is never copied into one bytes object
+    """
+    name, hasher = _new_hasher()
+    for start in range(0, len(text), HASH_CHUNK_SIZE):
+        hasher.update(text[start:start + HASH_CHUNK_SIZE].encode('utf-8', errors='surrogatepass'))
+    return f"{name}:{hasher.hexdigest()}"
+
+def hash_stream(stream, copy_to=None, block_size=HASH_CHUNK_SIZE):
+    """
+    Return a content digest for a binary stream, reading it in chunks and
+    rewinding it afterwards. If copy_to is given, each chunk is also written
+    to it, so the stream can be spooled and hashed in a single pass.
+    """
+    name, hasher = _new_hasher()
+    stream.seek(0)
+    for block in iter(lambda: stream.read(block_size), b""):
+        hasher.update(block)
+        if copy_to is not None:
+            copy_to.write(block)
+    stream.seek(0)
+    return f"{name}:{hasher.hexdigest()}"
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+class SummaryCache:
+    """
+    Caches JSON-serializable summary responses in Redis when REDIS_URL is set,
+    otherwise in an in-process LRU
+    """
+    def __init__(self, redis_url=None, ttl=CACHE_TTL, maxsize=LOCAL_CACHE_SIZE):
+        self.ttl = ttl
+        self._local = LRUCache(maxsize)
+        self._redis = None
+        if redis_url and redis is not None:
+            self._redis = redis.Redis.from_url(redis_url)
+        elif redis_url:
+            logger.warning("REDIS_URL is set but redis is not installed, using in-process cache")
+
+    def get(self, key):
+        if self._redis is not None:
+            try:
+                value = self._redis.get(f"summary:{key}")
+                return json.loads(value) if value is not None else None
+            except Exception as e:
+                logger.warning(f"Redis cache read failed: {str(e)}")
+        return self._local.get(key)
+
+    def set(self, key, value):
+        if self._redis is not None:
+            try:
+                self._redis.setex(f"summary:{key}", self.ttl, json.dumps(value))
+                return
+            except Exception as e:
+                logger.warning(f"Redis cache write failed: {str(e)}")
+        self._local.set(key, value)
+
+summary_cache = SummaryCache(os.environ.get("REDIS_URL"))
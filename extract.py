@@ -1,34 +1,166 @@
 import io
+import os
+import mmap
+import codecs
+import tempfile
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pdfplumber
 
-def extract_text_from_pdf_fileobj(fileobj):
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# PDFs with fewer pages than this are parsed in-process; below it the cost of
+# shipping work to the pool outweighs the parallel speedup
+PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+TXT_READ_SIZE = 1024 * 1024
+# TXT uploads already on disk and larger than this are decoded straight from an mmap
+TXT_MMAP_MIN_SIZE = 10 * 1024 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# PDFium is not thread-safe; every call into it goes through this lock
+_pdfium_lock = threading.Lock()
+
+def _get_executor():
+    """
+    Shared process pool for page extraction. Uses spawn so workers don't fork
+    the parent's loaded model and torch thread pools.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _discard_executor(executor):
+    """
+    Drop a broken pool so the next caller starts a fresh one
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+def _extract_pages_in_pool(path, n_pages):
+    """
+    Extract all pages of the PDF at path using the shared process pool
+    """
+    executor = _get_executor()
+    # One contiguous page range per worker so each only parses the file once
+    step = -(-n_pages // PDF_WORKERS)
+    try:
+        # submit() also raises if the pool broke while idle
+        futures = [executor.submit(_extract_pages, path, start, min(n_pages, start + step))
+                   for start in range(0, n_pages, step)]
+        return [part for future in futures for part in future.result() if part]
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise
+
+def _extract_pages(path, start, stop):
+    """
+    Extract text from pages [start, stop) of the PDF at path
+    """
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _extract_text_pdfium(path):
+    """
+    Extract text with PDFium, which is much faster than pdfminer for plain text
+    """
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            parts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+    return "\n".join(part for part in parts if part)
+
+def _extract_text_pdfplumber(path):
+    """
+    Extract text with pdfplumber, splitting large documents across worker
+    processes
+    """
+    with pdfplumber.open(path) as pdf:
+        n_pages = len(pdf.pages)
+        if n_pages < PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+            parts = [page.extract_text() or "" for page in pdf.pages]
+            return "\n".join(part for part in parts if part)
+    
+    try:
+        parts = _extract_pages_in_pool(path, n_pages)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); retry once on a fresh pool
+        print("PDF worker pool broke, retrying on a new pool")
+        parts = _extract_pages_in_pool(path, n_pages)
+    return "\n".join(parts)
+
+def extract_text_from_pdf_path(path):
     """
-    Extract text from PDF file object
+    Extract text from a PDF on disk, preferring PDFium with pdfplumber as
+    fallback. PDFium opens the path itself and memory-maps it.
     """
-    text = ""
+    if pdfium is not None:
+        try:
+            return _extract_text_pdfium(path)
+        except Exception as e:
+            print(f"PDFium extraction failed, falling back to pdfplumber: {e}")
     try:
-        with pdfplumber.open(fileobj) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+        return _extract_text_pdfplumber(path)
     except Exception as e:
         raise Exception(f"PDF extraction failed: {str(e)}")
-    
-    return text
+
+def _disk_fileno(stream):
+    """
+    Return the OS file descriptor behind stream, or None if it's in memory
+    """
+    # Werkzeug uploads arrive as SpooledTemporaryFile, whose fileno() would
+    # force an in-memory spool to roll over to disk. There is no public way to
+    # ask whether it already has, so this reads the private _rolled flag, and
+    # only for that exact type.
+    if isinstance(stream, tempfile.SpooledTemporaryFile) and not stream._rolled:
+        return None
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError):
+        return None
 
 def extract_text_from_txt_fileobj(fileobj, encoding='utf-8'):
     """
     Extract text from TXT file object
     """
     try:
+        fd = _disk_fileno(fileobj)
+        if fd is not None and os.fstat(fd).st_size > TXT_MMAP_MIN_SIZE:
+            # Decode directly from the page cache, skipping the bytes copy
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                return str(mm, encoding, 'ignore')
+        
         # Reset file pointer to beginning
         fileobj.seek(0)
-        data = fileobj.read()
-        
-        if isinstance(data, bytes):
-            data = data.decode(encoding, errors='ignore')
+        first = fileobj.read(TXT_READ_SIZE)
+        if isinstance(first, str):
+            return first + fileobj.read()
         
-        return data
+        # Decode incrementally so the whole upload never sits in memory as bytes
+        blocks = itertools.chain([first], iter(lambda: fileobj.read(TXT_READ_SIZE), b""))
+        return "".join(codecs.iterdecode(blocks, encoding, errors='ignore'))
     except Exception as e:
-        raise Exception(f"Text extraction failed: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Text extraction failed: {str(e)}")
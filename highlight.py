@@ -1,34 +1,122 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 import numpy as np
 import re
-import nltk
+import logging
+
+from cache import LRUCache, hash_text
+
+logger = logging.getLogger(__name__)
+
+# Documents longer than this are split with the regex instead of Punkt
+PUNKT_MAX_CHARS = 1_000_000
+
+# Above this many sentences bigrams dominate vocabulary cost for little gain
+BIGRAM_MAX_SENTENCES = 500
+
+# Above this many sentences, skip building a vocabulary and idf weights and
+# use stateless feature hashing instead (unigrams only, like the TF-IDF path
+# above BIGRAM_MAX_SENTENCES)
+HASHING_MIN_SENTENCES = 20000
+
+_hashing_vectorizer = HashingVectorizer(
+    stop_words='english',
+    ngram_range=(1, 1),
+    n_features=2 ** 18,
+    alternate_sign=False,
+    norm='l2'
+)
+
+# Documents longer than this are vectorized per call instead of cached, so the
+# cache can't pin many large sentence lists and matrices in memory
+FIT_CACHE_MAX_CHARS = 2_000_000
+
+# text digest -> (sentences, fitted vectorizer, sentence vectors)
+_fit_cache = LRUCache(maxsize=32)
+
+_SENT_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Resolve the sentence splitter once at import: NLTK Punkt if its model loads,
+# otherwise the regex splitter. Probing with a real call catches whichever
+# resource this NLTK version needs (punkt_tab on 3.9+).
+try:
+    from nltk.tokenize import sent_tokenize as _sent_split
+    _sent_split("Warm up. Load the model.")
+except Exception as e:
+    logger.warning(
+        f"NLTK Punkt model (punkt_tab) unavailable ({type(e).__name__}); highlights "
+        f"will use the regex sentence splitter. Install it with: "
+        f"python -m nltk.downloader punkt_tab"
+    )
+    _sent_split = _SENT_RE.split
 
 def split_into_sentences(text):
     """
     Split text into sentences using NLTK with regex fallback
     """
-    try:
-        # Try using NLTK for better sentence splitting
-        import nltk
+    # Punkt's Python-level scanning dominates on very large documents, where
+    # the regex split (run in C) is good enough
+    if len(text) > PUNKT_MAX_CHARS:
+        sentences = _SENT_RE.split(text)
+    else:
         try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
-        from nltk.tokenize import sent_tokenize
-        sentences = sent_tokenize(text)
-        return [s.strip() for s in sentences if s.strip()]
-    except Exception:
-        # Fallback to regex-based splitting
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        return [s.strip() for s in sentences if s.strip()]
+            sentences = _sent_split(text)
+        except Exception:
+            # Fallback to regex-based splitting
+            sentences = _SENT_RE.split(text)
+    return [s.strip() for s in sentences if s.strip()]
 
-def top_k_sentences(original_text, summary_text, k=5):
+def _fit_sentences(sentences):
     """
-    Find top k sentences from original text most relevant to summary
+    Vectorize the document's sentences (TF-IDF, or feature hashing for very
+    large documents) and return the vectorizer and sentence vectors
+    """
+    if len(sentences) >= HASHING_MIN_SENTENCES:
+        return _hashing_vectorizer, _hashing_vectorizer.transform(sentences)
+    
+    ngram_range = (1, 2) if len(sentences) <= BIGRAM_MAX_SENTENCES else (1, 1)
+    vectorizer = TfidfVectorizer(
+        stop_words='english', 
+        ngram_range=ngram_range,
+        max_features=5000,
+        norm='l2'
+    )
+    # One tokenization pass builds the vocabulary and the sentence vectors
+    return vectorizer, vectorizer.fit_transform(sentences)
+
+def _vectorize_document(original_text):
+    """
+    Split original_text into sentences and vectorize them
     """
     sentences = split_into_sentences(original_text)
+    try:
+        vectorizer, sent_vectors = _fit_sentences(sentences)
+    except ValueError as e:
+        # e.g. empty vocabulary; top_k_sentences falls back to leading sentences
+        print(f"TF-IDF fit failed: {str(e)}")
+        vectorizer, sent_vectors = None, None
+    return sentences, vectorizer, sent_vectors
+
+def _get_document_vectors(original_text, text_key=None):
+    """
+    Return (sentences, vectorizer, sentence vectors) for original_text, reusing
+    the fit from an earlier call on the same text. text_key, if given, must
+    identify the text (e.g. the upload digest) and saves hashing it.
+    """
+    if len(original_text) > FIT_CACHE_MAX_CHARS:
+        return _vectorize_document(original_text)
+    
+    key = text_key or hash_text(original_text)
+    cached = _fit_cache.get(key)
+    if cached is None:
+        cached = _vectorize_document(original_text)
+        _fit_cache.set(key, cached)
+    return cached
+
+def top_k_sentences(original_text, summary_text, k=5, text_key=None):
+    """
+    Find top k sentences from original text most relevant to summary
+    """
+    sentences, vectorizer, sent_vectors = _get_document_vectors(original_text, text_key)
     
     if len(sentences) == 0:
         return []
@@ -39,26 +127,26 @@ def top_k_sentences(original_text, summary_text, k=5):
                 for i, sent in enumerate(sentences)]
     
     try:
-        # Build TF-IDF vectors
-        vectorizer = TfidfVectorizer(
-            stop_words='english', 
-            ngram_range=(1, 2),
-            max_features=5000
-        ).fit(sentences + [summary_text])
+        if vectorizer is None:
+            raise ValueError("no TF-IDF model for this document")
         
-        sent_vectors = vectorizer.transform(sentences)
+        # Only the summary is vectorized per call; the sentence vectors are cached
         summary_vector = vectorizer.transform([summary_text])
         
-        # Calculate similarity scores
-        sim_scores = cosine_similarity(sent_vectors, summary_vector).flatten()
+        # TF-IDF rows are already L2-normalized, so cosine similarity is a
+        # plain sparse dot product
+        sim_scores = (sent_vectors @ summary_vector.T).toarray().ravel()
         
-        # Apply position weighting (earlier sentences often more important)
-        position_weights = np.linspace(1.0, 0.7, len(sentences))
-        combined_scores = sim_scores * position_weights
+        # Apply position weighting (earlier sentences often more important),
+        # in place on the fresh array toarray() returned
+        combined_scores = sim_scores
+        combined_scores *= np.linspace(1.0, 0.7, len(sentences))
         
         # Get top k indices
         k = min(k, len(sentences))
-        top_indices = np.argsort(combined_scores)[-k:][::-1]  # Descending order
+        # Partition out the top k in O(N), then sort just those (descending)
+        top_indices = np.argpartition(combined_scores, -k)[-k:]
+        top_indices = top_indices[np.argsort(-combined_scores[top_indices])]
         
         return [{
             "index": int(idx),
@@ -0,0 +1,104 @@
+import os
+import queue
+import uuid
+import logging
+import threading
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# How many queued jobs one batch may take, and how long to wait for more jobs
+# to arrive once the first is picked up
+JOB_MAX_BATCH = int(os.environ.get("JOB_MAX_BATCH", 8))
+JOB_MAX_WAIT = float(os.environ.get("JOB_MAX_WAIT", 0.05))
+# Jobs carry the full extracted text, so cap how many may wait at once
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 32))
+
+class JobQueueFull(Exception):
+    """Raised by BatchJobQueue.submit when the queue is at capacity"""
+
+class BatchJobQueue:
+    """
+    Runs submitted jobs on a background thread, handing batch_fn every job
+    that arrives within a short window so concurrent requests share one
+    model call. batch_fn takes a list of payloads and returns one result per
+    payload.
+    """
+    def __init__(self, batch_fn, max_batch=JOB_MAX_BATCH, max_wait=JOB_MAX_WAIT,
+                 max_queued=JOB_QUEUE_SIZE, max_finished=1024):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=max_queued)
+        # Unfinished jobs are tracked separately so they can never be evicted;
+        # only finished results age out of the LRU
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._jobs = LRUCache(maxsize=max_finished)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, payload):
+        """
+        Queue payload and return its job id. Raises JobQueueFull if too many
+        jobs are already waiting.
+        """
+        self._ensure_worker()
+        job_id = uuid.uuid4().hex
+        with self._pending_lock:
+            self._pending[job_id] = {"status": "queued"}
+        try:
+            self._queue.put_nowait((job_id, payload))
+        except queue.Full:
+            with self._pending_lock:
+                del self._pending[job_id]
+            raise JobQueueFull("Too many summary jobs queued")
+        return job_id
+
+    def get(self, job_id):
+        """
+        Return the job's state dict ({"status": ..., "result"/"error": ...}),
+        or None if the id is unknown or expired
+        """
+        with self._pending_lock:
+            job = self._pending.get(job_id)
+        return job if job is not None else self._jobs.get(job_id)
+
+    def _finish(self, job_id, state):
+        # Publish the result before dropping the pending entry so a poll in
+        # between never sees the job as missing
+        self._jobs.set(job_id, state)
+        with self._pending_lock:
+            self._pending.pop(job_id, None)
+
+    def _ensure_worker(self):
+        # Started lazily so a forked gunicorn worker gets its own live thread
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="summary-jobs", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=self.max_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            with self._pending_lock:
+                for job_id, _ in batch:
+                    self._pending[job_id] = {"status": "running"}
+            try:
+                results = self.batch_fn([payload for _, payload in batch])
+                for (job_id, _), result in zip(batch, results):
+                    self._finish(job_id, {"status": "done", "result": result})
+            except Exception as e:
+                logger.error(f"Summary job batch failed: {str(e)}")
+                for job_id, _ in batch:
+                    self._finish(job_id, {"status": "failed", "error": str(e)})
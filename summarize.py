@@ -1,12 +1,126 @@
+import os
+
+# Quieten transformers and let the tokenizer use its own thread pool; this has
+# to happen before transformers is imported.
+os.environ.setdefault("TRANSFORMERS_VERBOSITY", "error")
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+
+from functools import lru_cache
+import threading
+import torch
 from transformers import pipeline
 import math
 
-# Use a smaller, faster model for development
-try:
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=-1)
-except Exception as e:
-    print(f"BART model failed, trying smaller model: {e}")
-    summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6", device=-1)
+from highlight import top_k_sentences
+
+# DistilBART is the default; BART-large is opt-in via SUMMARIZER_MODEL and is
+# also the fallback if the default can't be loaded
+DEFAULT_MODEL = os.environ.get("SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-6-6")
+FALLBACK_MODEL = "facebook/bart-large-cnn"
+# Used for requests that ask for the fastest (lower quality) summary
+FAST_MODEL = os.environ.get("SUMMARIZER_FAST_MODEL", "google/flan-t5-small")
+
+# Dynamic int8 quantization of the Linear layers; set SUMMARIZER_QUANTIZE=0
+# to run the model in full FP32
+QUANTIZE = os.environ.get("SUMMARIZER_QUANTIZE", "1") == "1"
+
+# "torch" (default) or "onnx" to run the model through ONNX Runtime. An export
+# made with `optimum-cli export onnx --optimize O3` can be supplied through
+# SUMMARIZER_ONNX_PATH; otherwise the model is exported on first load.
+BACKEND = os.environ.get("SUMMARIZER_BACKEND", "torch")
+ONNX_PATH = os.environ.get("SUMMARIZER_ONNX_PATH")
+
+# ENABLE_BART=0 summarizes medium-length texts (under 2000 chars)
+# extractively instead of with the model
+ENABLE_BART = os.environ.get("ENABLE_BART", "1") == "1"
+
+# Device index for the torch backend: -1 for CPU, 0+ for a CUDA GPU. GPU
+# models run in FP16 and skip int8 quantization.
+DEVICE = int(os.environ.get("SUMMARIZER_DEVICE", "-1"))
+
+# Number of chunks fed to the model per forward pass
+BATCH_SIZE = int(os.environ.get("SUMMARIZER_BATCH_SIZE", "8"))
+
+# Serializes model construction so concurrent first requests don't each
+# allocate their own copy of the weights
+_load_lock = threading.RLock()
+
+def _quantize(summarizer):
+    """
+    Swap the model's Linear layers for int8 dynamic-quantized ones (CPU only)
+    """
+    try:
+        summarizer.model = torch.quantization.quantize_dynamic(
+            summarizer.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    except Exception as e:
+        print(f"Quantization failed, keeping FP32 model: {e}")
+    return summarizer
+
+def _load_onnx_pipeline(model_name):
+    """
+    Build a summarization pipeline backed by ONNX Runtime with IOBinding and
+    full graph optimization
+    """
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.enable_cpu_mem_arena = True
+    session_options.intra_op_num_threads = os.cpu_count() or 1
+
+    source = ONNX_PATH if ONNX_PATH and model_name == DEFAULT_MODEL else model_name
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        source,
+        export=source == model_name,
+        provider="CPUExecutionProvider",
+        session_options=session_options,
+        use_io_binding=True
+    )
+    tokenizer = AutoTokenizer.from_pretrained(source)
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+@lru_cache(maxsize=2)
+def _load_summarizer(model_name):
+    if BACKEND == "onnx":
+        try:
+            return _load_onnx_pipeline(model_name)
+        except Exception as e:
+            print(f"ONNX Runtime load of {model_name} failed, using torch: {e}")
+    try:
+        if DEVICE >= 0:
+            return pipeline("summarization", model=model_name, device=DEVICE, torch_dtype=torch.float16)
+        summarizer = pipeline("summarization", model=model_name, device=-1)
+        return _quantize(summarizer) if QUANTIZE else summarizer
+    except Exception as e:
+        if model_name == FALLBACK_MODEL:
+            raise
+        print(f"{model_name} failed to load, trying {FALLBACK_MODEL}: {e}")
+        return _load_summarizer(FALLBACK_MODEL)
+
+def _get_summarizer(model_name=None):
+    """
+    Return the shared summarization pipeline for model_name, loading it on
+    first use
+    """
+    with _load_lock:
+        return _load_summarizer(model_name or DEFAULT_MODEL)
+
+def summary_config_key(fast=False):
+    """
+    Identify the process-level settings that change summarize output, for
+    use in cache keys shared between deployments
+    """
+    model_name = FAST_MODEL if fast else DEFAULT_MODEL
+    return f"{model_name}:{BACKEND}:bart={int(ENABLE_BART)}"
+
+def preload_summarizer():
+    """
+    Load the default model up front (e.g. in the gunicorn master with --preload)
+    """
+    _get_summarizer()
 
 def chunk_text_by_tokens(text, approx_chars=800):  # Smaller chunks
     """
@@ -39,65 +153,127 @@ def chunk_text_by_tokens(text, approx_chars=800):  # Smaller chunks
         if chunk:  # Only add non-empty chunks
             chunks.append(chunk)
         
-        start = end
-        if start == end:  # Prevent infinite loop
-            start += 1
+        start = max(end, start + 1)  # Prevent infinite loop
     
     return chunks
 
-def generate_summary(text, max_chunk_chars=800, summary_max_length=150, summary_min_length=40):
+def _fewer_words_than(text, limit):
     """
-    Generate summary for the given text - optimized for speed
+    True if text has fewer than limit words, without splitting all of a long text
+    """
+    return len(text.split(None, limit)) < limit
+
+def _extractive_summary(text, num_sentences=3):
+    """
+    Pick the sentences closest to the document's own TF-IDF centroid, in
+    document order; milliseconds instead of a model call
+    """
+    top = top_k_sentences(text, text, k=num_sentences)
+    return " ".join(item["sentence"] for item in sorted(top, key=lambda item: item["index"]))
+
+def _summarize_batch(summarizer, texts, max_length, min_length):
+    """
+    Summarize texts in a single batched pipeline call. If the batch fails,
+    each input is retried on its own; inputs that still fail come back as
+    None so callers can fall back for just those.
     """
-    # For very short texts, return as is
-    if len(text) < 150:
-        return text[:summary_max_length]
+    params = dict(
+        max_length=max_length,
+        min_length=min_length,
+        do_sample=False,
+        num_beams=1,
+        truncation=True
+    )
+    try:
+        out = summarizer(texts, batch_size=BATCH_SIZE, **params)
+        return [result['summary_text'] for result in out]
+    except Exception as e:
+        print(f"Batch summarization of {len(texts)} inputs failed, retrying individually: {str(e)}")
     
-    # For medium texts, summarize directly
-    if len(text) < 2000:
+    summaries = []
+    for i, text in enumerate(texts):
         try:
-            out = summarizer(
-                text, 
-                max_length=summary_max_length, 
-                min_length=summary_min_length, 
-                do_sample=False
-            )
-            return out[0]['summary_text']
+            summaries.append(summarizer(text, **params)[0]['summary_text'])
         except Exception as e:
-            print(f"Direct summarization failed: {e}, using fallback")
-            return text[:summary_max_length]
+            print(f"Input {i} summarization failed: {str(e)}")
+            summaries.append(None)
+    return summaries
+
+def summarize_many(texts, max_chunk_chars=800, summary_max_length=150, summary_min_length=40, fast=False):
+    """
+    Generate summaries for several texts, sending every model input across
+    all of them through shared batched calls
+    """
+    summarizer = _get_summarizer(FAST_MODEL if fast else None)
+    results = [None] * len(texts)
+    direct = []
+    chunked = {}
     
-    # Split into manageable chunks only for large texts
-    chunks = chunk_text_by_tokens(text, approx_chars=max_chunk_chars)
+    for i, text in enumerate(texts):
+        # For very short texts, return as is
+        if len(text) < 150:
+            results[i] = text[:summary_max_length]
+        # Texts not much longer than the summary itself are returned as-is
+        elif _fewer_words_than(text, 2 * summary_max_length):
+            results[i] = text.strip()
+        # For medium texts, summarize directly (or extractively if the model is disabled)
+        elif len(text) < 2000:
+            if ENABLE_BART:
+                direct.append(i)
+            else:
+                results[i] = _extractive_summary(text)
+        # Split into manageable chunks only for large texts
+        else:
+            chunks = chunk_text_by_tokens(text, approx_chars=max_chunk_chars)
+            if chunks:
+                chunked[i] = chunks
+            else:
+                results[i] = "No content to summarize."
     
-    if not chunks:
-        return "No content to summarize."
+    if direct:
+        out = _summarize_batch(
+            summarizer,
+            [texts[i] for i in direct],
+            summary_max_length,
+            summary_min_length
+        )
+        for n, i in enumerate(direct):
+            results[i] = out[n] if out[n] is not None else texts[i][:summary_max_length]
     
-    summaries = []
+    # Very short chunks pass through as-is; the rest go to the model as one
+    # padded batch instead of one forward pass per chunk
+    summaries = {i: list(chunks) for i, chunks in chunked.items()}
+    to_summarize = [(i, j) for i, chunks in chunked.items()
+                    for j, chunk in enumerate(chunks) if len(chunk.split()) >= 10]
     
-    for i, chunk in enumerate(chunks):
-        try:
-            # Skip very short chunks
-            if len(chunk.split()) < 10:
-                summaries.append(chunk)
-                continue
-                
-            out = summarizer(
-                chunk, 
-                max_length=min(100, summary_max_length),  # Smaller chunk summaries
-                min_length=min(20, summary_min_length), 
-                do_sample=False
-            )
-            summaries.append(out[0]['summary_text'])
-        except Exception as e:
-            # Fallback for problematic chunks
-            print(f"Chunk {i} summarization failed: {str(e)}")
-            summaries.append(chunk[:100])  # Smaller fallback
+    if to_summarize:
+        out = _summarize_batch(
+            summarizer,
+            [chunked[i][j] for i, j in to_summarize],
+            min(100, summary_max_length),  # Smaller chunk summaries
+            min(20, summary_min_length)
+        )
+        for n, (i, j) in enumerate(to_summarize):
+            summaries[i][j] = out[n] if out[n] is not None else chunked[i][j][:100]  # Smaller fallback
     
-    # If only one chunk, return its summary
-    if len(summaries) == 1:
-        return summaries[0]
+    for i, parts in summaries.items():
+        # If only one chunk, return its summary
+        if len(parts) == 1:
+            results[i] = parts[0]
+        else:
+            # Combine and return without second summarization to save time
+            results[i] = " ".join(parts)[:summary_max_length]
     
-    # Combine and return without second summarization to save time
-    combined = " ".join(summaries)
-    return combined[:summary_max_length]
\ No newline at end of file
+    return results
+
+def generate_summary(text, max_chunk_chars=800, summary_max_length=150, summary_min_length=40, fast=False):
+    """
+    Generate summary for the given text - optimized for speed
+    """
+    return summarize_many(
+        [text],
+        max_chunk_chars=max_chunk_chars,
+        summary_max_length=summary_max_length,
+        summary_min_length=summary_min_length,
+        fast=fast
+    )[0]